@@ -6,13 +6,15 @@ A user-friendly web interface for Altman Z-Score analysis with live benchmarking
 """
 
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from matplotlib.figure import Figure  # No pyplot: figures are built per call and never shown
 from datetime import datetime
-import numpy as np
 import io
+import time
+
+from financials import (
+    BENCHMARKS_PATH, INDUSTRIES, MIN_BENCHMARK_COMPANIES, calculate_z_score, compute_industry_benchmark,
+    load_financials, load_financials_batch, score_companies, summarize_scores
+)
 
 # Page configuration
 st.set_page_config(
@@ -44,132 +46,41 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Industry ticker mappings
-INDUSTRIES = {
-    'Manufacturing': ['F', 'GM', 'CAT', 'DE', 'BA', 'GE', 'MMM', 'HON'],
-    'Retail': ['WMT', 'TGT', 'COST', 'HD', 'LOW', 'AMZN', 'EBAY'],
-    'Technology': ['AAPL', 'MSFT', 'GOOGL', 'META', 'NVDA', 'AMD', 'INTC', 'ORCL'],
-    'Healthcare': ['JNJ', 'UNH', 'PFE', 'ABBV', 'TMO', 'ABT', 'DHR', 'BMY'],
-    'Food & Beverage': ['KO', 'PEP', 'MCD', 'SBUX', 'KHC', 'GIS', 'K', 'HSY'],
-    'Transportation': ['UPS', 'FDX', 'UAL', 'DAL', 'AAL', 'LUV', 'NSC', 'UNP'],
-    'Energy': ['XOM', 'CVX', 'COP', 'SLB', 'EOG', 'MPC', 'PSX', 'VLO'],
-    'Finance': ['JPM', 'BAC', 'WFC', 'C', 'GS', 'MS', 'BLK', 'SCHW'],
-    'Consumer Goods': ['PG', 'KMB', 'CL', 'EL', 'NKE', 'LULU', 'TJX', 'ROST'],
-    'Automotive': ['TSLA', 'F', 'GM', 'TM', 'HMC', 'STLA', 'RIVN'],
-    'Telecommunications': ['T', 'VZ', 'TMUS', 'CMCSA', 'DIS', 'NFLX']
+# Risk zone lookup table indexed by get_risk_zone: (label, CSS class, emoji, chart color)
+RISK_ZONES = (
+    ('Distress Zone', 'distress-zone', '🔴', '#dc3545'),
+    ('Gray Zone', 'gray-zone', '🟡', '#ffc107'),
+    ('Safe Zone', 'safe-zone', '🟢', '#28a745')
+)
+
+# Recommendation per risk zone label: (Streamlit alert, message)
+ZONE_RECOMMENDATIONS = {
+    'Distress Zone': (st.error, "✗ High distress risk. Immediate action needed to improve financial position."),
+    'Gray Zone': (st.warning, "⚠ Moderate risk detected. Monitor liquidity and profitability closely."),
+    'Safe Zone': (st.success, "✓ Excellent financial health. Focus on strategic growth opportunities.")
 }
 
+# Precomputed benchmarks older than this are treated as stale (the builder runs daily)
+BENCHMARKS_MAX_AGE = 2 * 86400
+
 
 @st.cache_data(ttl=3600)
 def fetch_financials(ticker):
-    """Fetch quarterly financial data from Yahoo Finance with comprehensive field name alternatives."""
-    try:
-        company = yf.Ticker(ticker)
-        bs = company.quarterly_balance_sheet.iloc[:, 0]
-        inc = company.quarterly_financials.iloc[:, 0]
-        
-        # Helper function to try multiple field names
-        def get_field(source, field_names, default=0):
-            """Try multiple field name variations and return the first non-zero value found."""
-            for field in field_names:
-                value = source.get(field, None)
-                if value is not None and value != 0:
-                    return value, field
-            return default, None
-        
-        # Try multiple field name variations for each variable
-        total_assets, ta_field = get_field(bs, [
-            'Total Assets', 'TotalAssets'
-        ])
-        
-        current_assets, ca_field = get_field(bs, [
-            'Current Assets', 'CurrentAssets'
-        ])
-        
-        current_liabilities, cl_field = get_field(bs, [
-            'Current Liabilities', 'CurrentLiabilities'
-        ])
-        
-        retained_earnings, re_field = get_field(bs, [
-            'Retained Earnings', 'RetainedEarnings', 'Accumulated Deficit'
-        ])
-        
-        ebit, ebit_field = get_field(inc, [
-            'EBIT', 'Operating Income', 'OperatingIncome', 
-            'Earnings Before Interest And Taxes'
-        ])
-        
-        total_liabilities, tl_field = get_field(bs, [
-            'Total Liabilities Net Minority Interest', 
-            'Total Liabilities', 'TotalLiabilities'
-        ])
-        
-        market_value_equity, mve_field = get_field(bs, [
-            'Common Stock Equity', 'Stockholders Equity', 
-            'StockholdersEquity', 'Total Equity Gross Minority Interest'
-        ])
-        
-        total_revenue, tr_field = get_field(inc, [
-            'Total Revenue', 'TotalRevenue', 'Revenue'
-        ])
-        
-        # Build data dictionary
-        data = {
-            'total_assets': total_assets,
-            'current_assets': current_assets,
-            'current_liabilities': current_liabilities,
-            'retained_earnings': retained_earnings,
-            'ebit': ebit,
-            'total_liabilities': total_liabilities,
-            'market_value_equity': market_value_equity,
-            'total_revenue': total_revenue
-        }
-        
-        # Build diagnostics dictionary
-        diagnostics = {
-            'total_assets': {'value': total_assets, 'field': ta_field, 'found': ta_field is not None},
-            'current_assets': {'value': current_assets, 'field': ca_field, 'found': ca_field is not None},
-            'current_liabilities': {'value': current_liabilities, 'field': cl_field, 'found': cl_field is not None},
-            'retained_earnings': {'value': retained_earnings, 'field': re_field, 'found': re_field is not None},
-            'ebit': {'value': ebit, 'field': ebit_field, 'found': ebit_field is not None},
-            'total_liabilities': {'value': total_liabilities, 'field': tl_field, 'found': tl_field is not None},
-            'market_value_equity': {'value': market_value_equity, 'field': mve_field, 'found': mve_field is not None},
-            'total_revenue': {'value': total_revenue, 'field': tr_field, 'found': tr_field is not None}
-        }
-        
-        # Check if critical fields are missing
-        if total_assets == 0 or total_revenue == 0:
-            return None, diagnostics
-        
-        return data, diagnostics
-    except Exception as e:
-        return None, {'error': str(e)}
+    """Fetch quarterly financial data for a ticker, cached in-process on top of the disk cache."""
+    return load_financials(ticker)
 
 
-def calculate_z_score(data):
-    """Calculate Altman Z-Score from financial data."""
-    df = pd.DataFrame([data])
-    
-    wc = df['current_assets'] - df['current_liabilities']
-    df['x1'] = wc / df['total_assets']
-    df['x2'] = df['retained_earnings'] / df['total_assets']
-    df['x3'] = df['ebit'] / df['total_assets']
-    df['x4'] = df['market_value_equity'] / df['total_liabilities'].replace(0, 1)
-    df['x5'] = df['total_revenue'] / df['total_assets']
-    
-    df['z_score'] = (1.2 * df['x1'] + 1.4 * df['x2'] + 3.3 * df['x3'] + 
-                     0.6 * df['x4'] + 1.0 * df['x5'])
-    
-    return df.iloc[0]
+@st.cache_data(ttl=3600)
+def fetch_financials_batch(tickers):
+    """Fetch quarterly financial data for several tickers, cached in-process on top of the disk cache."""
+    return load_financials_batch(tickers)
 
 
 def get_risk_zone(z_score):
     """Classify financial health based on Altman Z-Score."""
-    if z_score > 2.99:
-        return 'Safe Zone', 'safe-zone', '🟢'
-    elif z_score >= 1.81:
-        return 'Gray Zone', 'gray-zone', '🟡'
-    return 'Distress Zone', 'distress-zone', '🔴'
+    # Gray zone is 1.81 <= Z <= 2.99, so each boundary needs its own comparison;
+    # int() keeps the sum integral for NumPy scalars, where bool_ + bool_ is a logical OR
+    return RISK_ZONES[int(z_score >= 1.81) + int(z_score > 2.99)]
 
 
 def display_data_diagnostics(diagnostics, ticker):
@@ -216,8 +127,7 @@ def display_data_diagnostics(diagnostics, ticker):
         })
     
     # Display table
-    diag_df = pd.DataFrame(diag_data)
-    st.dataframe(diag_df, use_container_width=True, hide_index=True)
+    st.dataframe(diag_data, use_container_width=True, hide_index=True)
     
     # Summary message
     if missing_count == 0:
@@ -246,91 +156,84 @@ def display_data_diagnostics(diagnostics, ticker):
 
 @st.cache_data(ttl=3600)
 def get_industry_benchmark(industry, max_companies=8):
-    """Fetch live benchmark data from industry companies."""
-    tickers = INDUSTRIES.get(industry, INDUSTRIES['Manufacturing'])[:max_companies]
-    
-    z_scores = []
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    """Fetch live benchmark data from industry companies (no UI; see get_benchmark)."""
+    return compute_industry_benchmark(industry, max_companies)
+
+
+@st.cache_data(max_entries=1)
+def load_precomputed_benchmarks(mtime):
+    """Load the offline benchmark table keyed by industry; mtime keys the cache to the file version."""
+    import polars as pl  # Lazy: only needed when a precomputed table exists
     
-    for i, ticker in enumerate(tickers):
-        status_text.text(f"Fetching {ticker}...")
-        result = fetch_financials(ticker)
-        if result and result[0]:  # Check if data was fetched successfully
-            data, _ = result  # Unpack tuple, ignore diagnostics for benchmark
-            calc_result = calculate_z_score(data)
-            if not np.isnan(calc_result['z_score']) and not np.isinf(calc_result['z_score']):
-                z_scores.append(calc_result['z_score'])
-        progress_bar.progress((i + 1) / len(tickers))
+    return {row['industry']: row for row in pl.read_parquet(BENCHMARKS_PATH).to_dicts()}
+
+
+def get_benchmark(industry, live=False):
+    """Return precomputed industry benchmark data, falling back to a live fetch when requested or unavailable."""
+    if not live and BENCHMARKS_PATH.exists():
+        mtime = BENCHMARKS_PATH.stat().st_mtime
+        if time.time() - mtime > BENCHMARKS_MAX_AGE:
+            st.warning("Precomputed benchmarks are more than 2 days old; fetching live data instead.")
+        else:
+            benchmark = load_precomputed_benchmarks(mtime).get(industry)
+            # Rows built from too few companies fall through to the live fetch, which warns if still low
+            if benchmark is not None and benchmark['count'] >= MIN_BENCHMARK_COMPANIES:
+                return benchmark
     
-    progress_bar.empty()
-    status_text.empty()
+    # UI lives here rather than in the cached fetch: status updates are not replayed on cache hits
+    with st.status(f"Fetching {industry} benchmark companies...", expanded=False) as status:
+        benchmark = get_industry_benchmark(industry)
+        status.update(label=f"Benchmark built from {benchmark['count']} {industry} companies", state="complete")
     
-    if len(z_scores) < 3:
-        st.warning(f"Only {len(z_scores)} companies fetched successfully")
+    if benchmark['count'] < MIN_BENCHMARK_COMPANIES:
+        st.warning(f"Only {benchmark['count']} companies fetched successfully")
     
-    return {
-        'industry': industry,
-        'count': len(z_scores),
-        'avg': np.mean(z_scores),
-        'median': np.median(z_scores),
-        'top_25': np.percentile(z_scores, 75),
-        'bottom_25': np.percentile(z_scores, 25),
-        'scores': z_scores
-    }
+    return benchmark
 
 
 def get_custom_benchmark(ticker_string):
     """Fetch benchmark data from user-specified competitor tickers."""
     tickers = [t.strip().upper() for t in ticker_string.split(',') if t.strip()]
+    tickers = list(dict.fromkeys(tickers))  # Drop duplicate entries, keep input order
     
     if not tickers:
         return None
     
-    z_scores = []
-    successful_tickers = []
-    
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for i, ticker in enumerate(tickers):
-        status_text.text(f"Fetching {ticker}...")
-        result = fetch_financials(ticker)
-        if result and result[0]:  # Check if data was fetched successfully
-            data, _ = result  # Unpack tuple, ignore diagnostics for benchmark
-            calc_result = calculate_z_score(data)
-            if not np.isnan(calc_result['z_score']) and not np.isinf(calc_result['z_score']):
-                z_scores.append(calc_result['z_score'])
-                successful_tickers.append(ticker)
-        progress_bar.progress((i + 1) / len(tickers))
+    # One status container updated once, rather than a repaint per ticker
+    with st.status(f"Fetching {len(tickers)} companies...", expanded=False) as status:
+        results = fetch_financials_batch(tuple(tickers))
+        fetched = [t for t in tickers if results[t][0]]
+        status.update(label=f"Fetched {len(fetched)} of {len(tickers)} companies", state="complete")
     
-    progress_bar.empty()
-    status_text.empty()
+    z_scores, successful_tickers = score_companies(tickers, results)
     
-    if len(z_scores) < 2:
-        st.error(f"Only {len(z_scores)} companies fetched. Need at least 2 for benchmark.")
+    if z_scores.size < 2:
+        st.error(f"Only {z_scores.size} companies fetched. Need at least 2 for benchmark.")
         return None
     
-    st.success(f"✓ Benchmark created from {len(z_scores)} companies: {', '.join(successful_tickers)}")
+    st.success(f"✓ Benchmark created from {z_scores.size} companies: {', '.join(successful_tickers)}")
     
     return {
         'industry': 'Custom Comparison',
-        'count': len(z_scores),
+        'count': z_scores.size,
         'companies': successful_tickers,
-        'avg': np.mean(z_scores),
-        'median': np.median(z_scores),
-        'top_25': np.percentile(z_scores, 75),
-        'bottom_25': np.percentile(z_scores, 25),
-        'scores': z_scores
+        **summarize_scores(z_scores),
+        'scores': z_scores.tolist()
     }
 
 
-def create_visualization(company_name, result, benchmark):
-    """Create visual analysis charts."""
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 10))
+@st.cache_data(max_entries=32)
+def create_visualization(company_name, z, x1, x2, x3, x4, x5, avg, top_25, bottom_25, scores):
+    """Create visual analysis charts and return them as PNG bytes.
     
-    z = result['z_score']
-    color = '#28a745' if z > 2.99 else '#ffc107' if z >= 1.81 else '#dc3545'
+    Takes primitive arguments (scores as a tuple) so Streamlit can hash them and
+    reuse the rendered PNG on reruns with unchanged inputs.
+    """
+    # A standalone Figure keeps pyplot's global state out of concurrent sessions
+    fig = Figure(figsize=(16, 10))
+    (ax1, ax2), (ax3, ax4) = fig.subplots(2, 2)
+    
+    color = get_risk_zone(z)[3]
     
     # Chart 1: Z-Score gauge
     ax1.barh(['Your Company'], [z], color=color, alpha=0.7, edgecolor='black', linewidth=2)
@@ -343,9 +246,9 @@ def create_visualization(company_name, result, benchmark):
     
     # Chart 2: Industry comparison
     companies = ['You', 'Avg', 'Top 25%', 'Bottom 25%']
-    scores = [z, benchmark['avg'], benchmark['top_25'], benchmark['bottom_25']]
+    comparison = [z, avg, top_25, bottom_25]
     colors_comp = [color, '#6c757d', '#28a745', '#dc3545']
-    ax2.bar(companies, scores, color=colors_comp, alpha=0.7, edgecolor='black', linewidth=2)
+    ax2.bar(companies, comparison, color=colors_comp, alpha=0.7, edgecolor='black', linewidth=2)
     ax2.set_ylabel('Z-Score', fontsize=12, fontweight='bold')
     ax2.set_title('Industry Comparison', fontsize=14, fontweight='bold')
     ax2.grid(axis='y', alpha=0.3)
@@ -353,31 +256,39 @@ def create_visualization(company_name, result, benchmark):
     # Chart 3: Component breakdown
     components = ['X1\nWorking\nCapital', 'X2\nRetained\nEarnings', 
                   'X3\nEBIT', 'X4\nMarket\nValue', 'X5\nSales']
-    contributions = [1.2*result['x1'], 1.4*result['x2'], 3.3*result['x3'], 
-                     0.6*result['x4'], 1.0*result['x5']]
+    contributions = [1.2*x1, 1.4*x2, 3.3*x3, 0.6*x4, 1.0*x5]
     ax3.bar(components, contributions, color='steelblue', alpha=0.7, edgecolor='black', linewidth=2)
     ax3.set_ylabel('Contribution to Z-Score', fontsize=12, fontweight='bold')
     ax3.set_title('Component Contributions', fontsize=14, fontweight='bold')
     ax3.grid(axis='y', alpha=0.3)
     
     # Chart 4: Industry distribution
-    ax4.hist(benchmark['scores'], bins=15, color='lightblue', edgecolor='black', alpha=0.7)
+    ax4.hist(scores, bins=15, color='lightblue', edgecolor='black', alpha=0.7)
     ax4.axvline(z, color=color, linestyle='--', linewidth=3, label=f'Your Score: {z:,.0f}')
-    ax4.axvline(benchmark['avg'], color='gray', linestyle=':', linewidth=2, label=f'Industry Avg: {benchmark["avg"]:,.0f}')
+    ax4.axvline(avg, color='gray', linestyle=':', linewidth=2, label=f'Industry Avg: {avg:,.0f}')
     ax4.set_xlabel('Z-Score', fontsize=12, fontweight='bold')
     ax4.set_ylabel('Frequency', fontsize=12, fontweight='bold')
     ax4.set_title('Industry Z-Score Distribution', fontsize=14, fontweight='bold')
     ax4.legend()
     ax4.grid(alpha=0.3)
     
-    plt.tight_layout()
-    return fig
+    fig.tight_layout()
+    
+    # Rasterize once; the same PNG serves both display and download
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    return buf.getvalue()
 
 
+@st.fragment
 def display_analysis(company_name, result, benchmark):
-    """Display comprehensive analysis results."""
+    """Display comprehensive analysis results.
+    
+    Runs as a fragment: interactions inside the report (e.g. the download button)
+    rerun only this panel instead of the whole script.
+    """
     z = result['z_score']
-    zone, zone_class, emoji = get_risk_zone(z)
+    zone, zone_class, emoji, _ = get_risk_zone(z)
     
     # Header
     st.markdown(f"<h2 style='text-align: center;'>{emoji} Financial Health Report: {company_name}</h2>", 
@@ -401,51 +312,45 @@ def display_analysis(company_name, result, benchmark):
     
     # Component breakdown
     st.subheader("📊 Component Breakdown")
-    breakdown_df = pd.DataFrame({
-        'Component': [
-            'X1: Working Capital / Total Assets',
-            'X2: Retained Earnings / Total Assets',
-            'X3: EBIT / Total Assets',
-            'X4: Market Value / Total Liabilities',
-            'X5: Sales / Total Assets'
-        ],
-        'Ratio': [result['x1'], result['x2'], result['x3'], result['x4'], result['x5']],
-        'Weight': [1.2, 1.4, 3.3, 0.6, 1.0],
-        'Contribution': [
-            1.2*result['x1'], 1.4*result['x2'], 3.3*result['x3'],
-            0.6*result['x4'], 1.0*result['x5']
-        ]
-    })
-    st.dataframe(breakdown_df.style.format({
-        'Ratio': '{:,.0f}',
-        'Weight': '{:,.0f}',
-        'Contribution': '{:,.0f}'
-    }), use_container_width=True)
+    components = [
+        ('X1: Working Capital / Total Assets', result['x1'], 1.2),
+        ('X2: Retained Earnings / Total Assets', result['x2'], 1.4),
+        ('X3: EBIT / Total Assets', result['x3'], 3.3),
+        ('X4: Market Value / Total Liabilities', result['x4'], 0.6),
+        ('X5: Sales / Total Assets', result['x5'], 1.0)
+    ]
+    st.dataframe([
+        {
+            'Component': label,
+            'Ratio': f"{ratio:,.0f}",
+            'Weight': f"{weight:,.0f}",
+            'Contribution': f"{weight * ratio:,.0f}"
+        }
+        for label, ratio, weight in components
+    ], use_container_width=True, hide_index=True)
     
     # Visualization
     st.subheader("📈 Visual Analysis")
-    fig = create_visualization(company_name, result, benchmark)
-    st.pyplot(fig)
+    png = create_visualization(
+        company_name, result['z_score'],
+        result['x1'], result['x2'], result['x3'], result['x4'], result['x5'],
+        benchmark['avg'], benchmark['top_25'], benchmark['bottom_25'],
+        tuple(benchmark['scores'])
+    )
+    st.image(png)
     
     # Download button
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-    buf.seek(0)
     st.download_button(
         label="📥 Download Chart",
-        data=buf,
+        data=png,
         file_name=f"financial_health_{company_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.png",
         mime="image/png"
     )
     
     # Recommendations
     st.subheader("💡 Recommendations")
-    if z > 2.99:
-        st.success("✓ Excellent financial health. Focus on strategic growth opportunities.")
-    elif z >= 1.81:
-        st.warning("⚠ Moderate risk detected. Monitor liquidity and profitability closely.")
-    else:
-        st.error("✗ High distress risk. Immediate action needed to improve financial position.")
+    alert, message = ZONE_RECOMMENDATIONS[zone]
+    alert(message)
 
 
 # Main App
@@ -463,6 +368,12 @@ def main():
          "📝 Example Analysis", "🎯 Custom Benchmark"]
     )
     
+    live_benchmark = st.sidebar.checkbox(
+        "Fetch live industry benchmark",
+        value=False,
+        help="Fetch industry peers from Yahoo Finance instead of using the precomputed daily benchmark"
+    )
+    
     st.sidebar.markdown("---")
     st.sidebar.info("""
     **About This Tool:**
@@ -523,7 +434,7 @@ def main():
                     }
                 
                     result = calculate_z_score(data)
-                    benchmark = get_industry_benchmark(industry)
+                    benchmark = get_benchmark(industry, live=live_benchmark)
                     
                     display_analysis(company_name, result, benchmark)
     
@@ -541,7 +452,7 @@ def main():
                     data, diagnostics = result  # Unpack tuple
                     calc_result = calculate_z_score(data)
                     z = calc_result['z_score']
-                    zone, _, emoji = get_risk_zone(z)
+                    zone, _, emoji, _ = get_risk_zone(z)
                     
                     st.success(f"✓ Data fetched successfully for {ticker}")
                     
@@ -591,7 +502,7 @@ def main():
                 }
                 
                 result = calculate_z_score(sample_data)
-                benchmark = get_industry_benchmark('Manufacturing')
+                benchmark = get_benchmark('Manufacturing', live=live_benchmark)
                 
                 display_analysis("Example Company", result, benchmark)
     
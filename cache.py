@@ -0,0 +1,55 @@
+"""
+Corporate Financial Health Analyzer - On-Disk Cache
+Team 10 Final Project
+
+File-backed cache for fetched financial data, so previously seen tickers
+survive Streamlit server restarts without refetching from Yahoo Finance.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+
+class FileCache:
+    """Store one JSON file per ticker holding {ts, data, diagnostics}."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, key):
+        """Build the cache file path for a ticker, keeping the name filesystem-safe."""
+        safe_key = re.sub(r'[^A-Za-z0-9._^=-]', '_', key)
+        return self.directory / f"{safe_key}_financials.json"
+
+    def get(self, key, ttl):
+        """Return cached (data, diagnostics) if younger than ttl seconds, otherwise None."""
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+            if time.time() - entry['ts'] > ttl:
+                return None
+            return entry['data'], entry['diagnostics']
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # Unreadable, malformed or foreign files are treated as a cache miss
+            return None
+
+    def set(self, key, data, diagnostics):
+        """Write (data, diagnostics) for a ticker; failures to write are ignored."""
+        entry = {'ts': time.time(), 'data': data, 'diagnostics': diagnostics}
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                # NumPy scalars from yfinance are not JSON-native; store them as floats
+                json.dump(entry, f, default=float)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,286 @@
+"""
+Corporate Financial Health Analyzer - Financial Data & Scoring
+Team 10 Final Project
+
+Fetching, caching and Altman Z-Score scoring of company financials, kept free of
+Streamlit so both the web app and scripts/build_benchmarks.py can use it.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from cache import FileCache
+
+# Industry ticker mappings
+INDUSTRIES = {
+    'Manufacturing': ['F', 'GM', 'CAT', 'DE', 'BA', 'GE', 'MMM', 'HON'],
+    'Retail': ['WMT', 'TGT', 'COST', 'HD', 'LOW', 'AMZN', 'EBAY'],
+    'Technology': ['AAPL', 'MSFT', 'GOOGL', 'META', 'NVDA', 'AMD', 'INTC', 'ORCL'],
+    'Healthcare': ['JNJ', 'UNH', 'PFE', 'ABBV', 'TMO', 'ABT', 'DHR', 'BMY'],
+    'Food & Beverage': ['KO', 'PEP', 'MCD', 'SBUX', 'KHC', 'GIS', 'K', 'HSY'],
+    'Transportation': ['UPS', 'FDX', 'UAL', 'DAL', 'AAL', 'LUV', 'NSC', 'UNP'],
+    'Energy': ['XOM', 'CVX', 'COP', 'SLB', 'EOG', 'MPC', 'PSX', 'VLO'],
+    'Finance': ['JPM', 'BAC', 'WFC', 'C', 'GS', 'MS', 'BLK', 'SCHW'],
+    'Consumer Goods': ['PG', 'KMB', 'CL', 'EL', 'NKE', 'LULU', 'TJX', 'ROST'],
+    'Automotive': ['TSLA', 'F', 'GM', 'TM', 'HMC', 'STLA', 'RIVN'],
+    'Telecommunications': ['T', 'VZ', 'TMUS', 'CMCSA', 'DIS', 'NFLX']
+}
+
+# Unique tickers across all industries (F and GM appear in two), for warming the cache in one batch
+ALL_TICKERS = frozenset(t for tickers in INDUSTRIES.values() for t in tickers)
+
+# Column order of the (N, 8) arrays consumed by calculate_z_scores_vec
+Z_SCORE_FIELDS = [
+    'total_assets', 'current_assets', 'current_liabilities', 'retained_earnings',
+    'ebit', 'total_liabilities', 'market_value_equity', 'total_revenue'
+]
+
+# Yahoo Finance field name variations per Z-Score input: (statement, aliases in priority order)
+FIELD_ALIASES = {
+    'total_assets': ('balance_sheet', ('Total Assets', 'TotalAssets')),
+    'current_assets': ('balance_sheet', ('Current Assets', 'CurrentAssets')),
+    'current_liabilities': ('balance_sheet', ('Current Liabilities', 'CurrentLiabilities')),
+    'retained_earnings': ('balance_sheet', ('Retained Earnings', 'RetainedEarnings', 'Accumulated Deficit')),
+    'ebit': ('income_statement', ('EBIT', 'Operating Income', 'OperatingIncome',
+                                  'Earnings Before Interest And Taxes')),
+    'total_liabilities': ('balance_sheet', ('Total Liabilities Net Minority Interest',
+                                            'Total Liabilities', 'TotalLiabilities')),
+    'market_value_equity': ('balance_sheet', ('Common Stock Equity', 'Stockholders Equity',
+                                              'StockholdersEquity', 'Total Equity Gross Minority Interest')),
+    'total_revenue': ('income_statement', ('Total Revenue', 'TotalRevenue', 'Revenue'))
+}
+
+# Shared worker pool for I/O-bound Yahoo Finance requests
+FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# Persistent cache below the app's st.cache_data; quarterly statements change slowly
+FINANCIALS_CACHE = FileCache(Path(__file__).parent / '.cache')
+FINANCIALS_CACHE_TTL = 86400
+
+# Industry benchmarks precomputed offline by scripts/build_benchmarks.py
+BENCHMARKS_PATH = Path(__file__).parent / 'data' / 'benchmarks.parquet'
+
+# Industry benchmarks scored from fewer companies than this are not reliable
+MIN_BENCHMARK_COMPANIES = 3
+
+# Memoized yf.Ticker objects: {symbol: (created_at, ticker)}, oldest first
+TICKER_CACHE = {}
+TICKER_CACHE_MAX = 128
+TICKER_CACHE_LOCK = threading.Lock()
+
+
+def get_tickers(symbols):
+    """Return {symbol: yf.Ticker}, reusing Ticker objects created within FINANCIALS_CACHE_TTL."""
+    now = time.time()
+    companies = {}
+    with TICKER_CACHE_LOCK:
+        # Evict expired entries so the memo doesn't grow for the life of the process
+        expired = [s for s, (created_at, _) in TICKER_CACHE.items() if now - created_at >= FINANCIALS_CACHE_TTL]
+        for symbol in expired:
+            del TICKER_CACHE[symbol]
+        for symbol in symbols:
+            if symbol.upper() in TICKER_CACHE:
+                companies[symbol] = TICKER_CACHE[symbol.upper()][1]
+    
+    # Build any missing symbols together; yfinance shares one HTTP session across them
+    missing = [s for s in symbols if s not in companies]
+    if missing:
+        import yfinance as yf  # Lazy: only paid for when a ticker misses every cache
+        
+        # yf.Tickers keys its result by upper-cased symbol, so the memo uses the same keys
+        created = yf.Tickers(" ".join(missing)).tickers
+        with TICKER_CACHE_LOCK:
+            for symbol in missing:
+                company = created.get(symbol.upper())
+                if company is not None:
+                    TICKER_CACHE[symbol.upper()] = (now, company)
+                companies[symbol] = company
+            
+            # Cap the memo size, dropping the oldest entries first
+            while len(TICKER_CACHE) > TICKER_CACHE_MAX:
+                del TICKER_CACHE[next(iter(TICKER_CACHE))]
+    
+    return companies
+
+
+def forget_ticker(symbol):
+    """Drop a memoized yf.Ticker so the next fetch starts from a fresh object."""
+    with TICKER_CACHE_LOCK:
+        TICKER_CACHE.pop(symbol.upper(), None)
+
+
+def get_ticker(symbol):
+    """Return a memoized yf.Ticker for a single symbol."""
+    return get_tickers([symbol])[symbol]
+
+
+def find_field(source, aliases):
+    """Return (value, field name) for the first alias with a non-zero value, or (0, None)."""
+    for field in aliases:
+        value = source.get(field)
+        if value:  # Skips both missing (None) and zero values
+            return value, field
+    return 0, None
+
+
+def extract_financials(company):
+    """Extract Z-Score inputs from a yfinance Ticker, trying comprehensive field name alternatives."""
+    try:
+        # Convert the latest quarter to plain dicts once; dict lookups avoid pandas Index overhead
+        statements = {
+            'balance_sheet': company.quarterly_balance_sheet.iloc[:, 0].to_dict(),
+            'income_statement': company.quarterly_financials.iloc[:, 0].to_dict()
+        }
+        
+        # Try each variable's field name variations in one pass over FIELD_ALIASES
+        data = {}
+        diagnostics = {}
+        for key, (statement, aliases) in FIELD_ALIASES.items():
+            value, field = find_field(statements[statement], aliases)
+            data[key] = value
+            diagnostics[key] = {'value': value, 'field': field, 'found': field is not None}
+        
+        # Check if critical fields are missing
+        if data['total_assets'] == 0 or data['total_revenue'] == 0:
+            return None, diagnostics
+        
+        return data, diagnostics
+    except Exception as e:
+        return None, {'error': str(e)}
+
+
+def store_financials(ticker, result):
+    """Persist a complete fetch result to the on-disk cache."""
+    data, diagnostics = result
+    # Errors and partial responses (data=None) may be transient, so they are retried next time
+    if data is not None:
+        FINANCIALS_CACHE.set(ticker, data, diagnostics)
+    else:
+        forget_ticker(ticker)  # Don't retry with a Ticker whose data fetch already failed
+
+
+def load_financials(ticker):
+    """Fetch quarterly financial data from Yahoo Finance, using the on-disk cache when fresh."""
+    cached = FINANCIALS_CACHE.get(ticker, ttl=FINANCIALS_CACHE_TTL)
+    if cached is not None:
+        return cached
+    
+    result = extract_financials(get_ticker(ticker))
+    store_financials(ticker, result)
+    return result
+
+
+def load_financials_batch(tickers):
+    """Fetch quarterly financial data for several tickers, reusing memoized yf.Ticker objects."""
+    results = {}
+    for ticker in tickers:
+        cached = FINANCIALS_CACHE.get(ticker, ttl=FINANCIALS_CACHE_TTL)
+        if cached is not None:
+            results[ticker] = cached
+    
+    missing = [t for t in tickers if t not in results]
+    if missing:
+        companies = get_tickers(missing)
+        futures = {FETCH_EXECUTOR.submit(extract_financials, companies[t]): t for t in missing}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            store_financials(futures[future], results[futures[future]])
+    
+    return results
+
+
+def calculate_z_score(data):
+    """Calculate Altman Z-Score from financial data."""
+    ta = data['total_assets'] or float('nan')  # Zero assets yields NaN ratios, not an exception
+    tl = data['total_liabilities'] or 1
+    
+    x1 = (data['current_assets'] - data['current_liabilities']) / ta
+    x2 = data['retained_earnings'] / ta
+    x3 = data['ebit'] / ta
+    x4 = data['market_value_equity'] / tl
+    x5 = data['total_revenue'] / ta
+    
+    z_score = 1.2 * x1 + 1.4 * x2 + 3.3 * x3 + 0.6 * x4 + 1.0 * x5
+    
+    return {'x1': x1, 'x2': x2, 'x3': x3, 'x4': x4, 'x5': x5, 'z_score': z_score}
+
+
+def calculate_z_scores_vec(arr):
+    """Calculate Altman Z-Scores for an (N, 8) array with columns in Z_SCORE_FIELDS order."""
+    ta = arr[:, 0]
+    x1 = (arr[:, 1] - arr[:, 2]) / ta
+    x2 = arr[:, 3] / ta
+    x3 = arr[:, 4] / ta
+    x4 = arr[:, 6] / np.where(arr[:, 5] == 0, 1, arr[:, 5])
+    x5 = arr[:, 7] / ta
+    
+    return 1.2 * x1 + 1.4 * x2 + 3.3 * x3 + 0.6 * x4 + 1.0 * x5
+
+
+def stack_financials(records):
+    """Stack financial data dicts into an (N, 8) float array for calculate_z_scores_vec."""
+    arr = np.full((len(records), len(Z_SCORE_FIELDS)), np.nan, dtype=np.float64)
+    for i, data in enumerate(records):
+        for j, field in enumerate(Z_SCORE_FIELDS):
+            arr[i, j] = data[field]
+    return arr
+
+
+def summarize_scores(z_scores):
+    """Compute benchmark average, median and quartiles of Z-Scores with one partial sort."""
+    arr = np.asarray(z_scores, dtype=np.float64)  # No copy for the float arrays benchmarks pass
+    n = arr.size
+    if n == 0:
+        return {'avg': np.nan, 'median': np.nan, 'top_25': np.nan, 'bottom_25': np.nan}
+    
+    # Linear-interpolated quantiles, as np.percentile computes them: each one needs only the
+    # two order statistics around position q * (n - 1), so one np.partition serves all three
+    bounds = {}
+    for q in (0.25, 0.5, 0.75):
+        pos = q * (n - 1)
+        lo = int(pos)
+        bounds[q] = (lo, min(lo + 1, n - 1), pos - lo)
+    part = np.partition(arr, sorted({i for lo, hi, _ in bounds.values() for i in (lo, hi)}))
+    
+    def quantile(q):
+        lo, hi, frac = bounds[q]
+        return part[lo] + (part[hi] - part[lo]) * frac
+    
+    return {
+        'avg': arr.mean(),
+        'median': quantile(0.5),
+        'top_25': quantile(0.75),
+        'bottom_25': quantile(0.25)
+    }
+
+
+def industry_tickers(industry, max_companies=8):
+    """Return the benchmark tickers for an industry, defaulting to Manufacturing."""
+    return INDUSTRIES.get(industry, INDUSTRIES['Manufacturing'])[:max_companies]
+
+
+def score_companies(tickers, results):
+    """Score fetched companies in one vectorized pass; returns (finite Z-Scores, tickers scored)."""
+    fetched = [t for t in tickers if results[t][0]]
+    scores = calculate_z_scores_vec(stack_financials([results[t][0] for t in fetched]))
+    valid = np.isfinite(scores)
+    return scores[valid], [t for t, ok in zip(fetched, valid) if ok]
+
+
+def compute_industry_benchmark(industry, max_companies=8, results=None):
+    """Compute an industry's Z-Score benchmark statistics, fetching its companies unless results has them."""
+    tickers = industry_tickers(industry, max_companies)
+    if results is None:
+        results = load_financials_batch(tuple(tickers))
+    z_scores, _ = score_companies(tickers, results)
+    
+    return {
+        'industry': industry,
+        'count': z_scores.size,
+        **summarize_scores(z_scores),
+        'scores': z_scores.tolist()
+    }
@@ -0,0 +1,47 @@
+"""
+Corporate Financial Health Analyzer - Benchmark Builder
+Team 10 Final Project
+
+Precomputes Z-Score benchmark statistics for every industry in INDUSTRIES and
+writes them to data/benchmarks.parquet, which the app reads instead of fetching
+peers live. Intended to run once a day (cron/CI):
+
+    python scripts/build_benchmarks.py
+"""
+
+import sys
+from pathlib import Path
+
+import polars as pl
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from financials import (  # noqa: E402
+    ALL_TICKERS, BENCHMARKS_PATH, INDUSTRIES, MIN_BENCHMARK_COMPANIES, compute_industry_benchmark,
+    load_financials_batch
+)
+
+
+def main():
+    # Fetch every unique ticker in one batch and score each industry from these results, so
+    # companies that fail (and are never written to the disk cache) aren't refetched per industry
+    results = load_financials_batch(tuple(sorted(ALL_TICKERS)))
+    
+    rows = []
+    for industry in INDUSTRIES:
+        benchmark = compute_industry_benchmark(industry, results=results)
+        # Leave out unreliable rows; the app fetches those industries live instead
+        if benchmark['count'] < MIN_BENCHMARK_COMPANIES:
+            print(f"{industry}: skipped, only {benchmark['count']} companies scored")
+            continue
+        rows.append(benchmark)
+        print(f"{industry}: {benchmark['count']} companies, avg Z-Score {benchmark['avg']:,.2f}")
+
+    BENCHMARKS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    pl.DataFrame(rows).write_parquet(BENCHMARKS_PATH)
+    print(f"Wrote {len(rows)} industries to {BENCHMARKS_PATH}")
+
+
+if __name__ == "__main__":
+    main()